@@ -13,11 +13,14 @@ Run: python generate_figures.py
 Output: figures/*.png
 """
 
+import math
 import numpy as np
 import matplotlib.pyplot as plt
-from mpmath import mp, mpf, pi as mp_pi, phi as mp_phi, log, atan
-from typing import List, Tuple
+from mpmath import mp, mpf, pi as mp_pi
+from typing import Dict, List, Tuple
 import os
+import hashlib
+import zipfile
 
 # Ensure figures directory exists
 os.makedirs('figures', exist_ok=True)
@@ -58,70 +61,156 @@ RATIONAL_APPROX = [
     (13, 16, -5), (-47, 67, -4), (-41, 39, -4), (71, 83, -6),
 ]
 
+# Golden ratio in float64, enough for plotting and the 10-digit tables
+PHI = (1.0 + math.sqrt(5.0)) / 2.0
+
+# The distinct powers of φ used by RATIONAL_APPROX
+_PHI_POW_CACHE = {k: PHI**k for k in set(p for _, _, p in RATIONAL_APPROX)}
+
+
+# Slot periods and offsets as separate lists of native ints, so denominators
+# stay Python ints and mpf / int division takes mpmath's integer fast path
+_PERIODS = [p for p, _ in SLOTS]
+_OFFSETS = [o for _, o in SLOTS]
+
+
+def _make_inner():
+    """Generate the unrolled slot sum c[0]/(4*k+1) + ... + c[7]/(12*k+11).
+
+    Every offset is positive, so no denominator is zero for k >= 0.
+    """
+    body = ' + '.join(f'c[{i}]/({p}*k+{o})' for i, (p, o) in enumerate(SLOTS))
+    namespace = {}
+    exec(f'def _inner(c, k):\n    return {body}\n', namespace)
+    return namespace['_inner']
+
+
+_inner = _make_inner()
+
+
+def _int_inner(k: int) -> mpf:
+    """Integer-only slot sum for term k, summed exactly and rounded once."""
+    denoms = [period * k + offset for period, offset in zip(_PERIODS, _OFFSETS)]
+    common = math.lcm(*denoms)
+    numer = sum(coef * (common // denom) for coef, denom in zip(INT_COEFS, denoms))
+    return mpf(numer) / common
+
+
+# mpf forms of the k-independent constants. -1/4096 and 1/64 are exact in
+# binary, so these are valid at any precision.
+_NEG_INV_4096 = mpf(-1) / mpf(4096)
+_INV_64 = mpf(1) / mpf(64)
+
+# INT_COEFS[i] + PHI_CORRECTIONS[i] rounds to the working precision, so the
+# effective coefficients are cached per mp.dps.
+_EFFECTIVE_COEFS_CACHE: Dict[int, List[mpf]] = {}
+
+
+def _effective_coefs() -> List[mpf]:
+    """Return the effective coefficients at the current mp.dps."""
+    coefs = _EFFECTIVE_COEFS_CACHE.get(mp.dps)
+    if coefs is None:
+        coefs = [mpf(INT_COEFS[i]) + mpf(PHI_CORRECTIONS[i]) for i in range(8)]
+        _EFFECTIVE_COEFS_CACHE[mp.dps] = coefs
+    return coefs
+
+
+# Figure 1 partial-sum sequences keyed on (max_n, precision)
+_SEQUENCE_CACHE: Dict[Tuple[int, int], Tuple[List[mpf], List[mpf]]] = {}
+
 
 # =============================================================================
 # FORMULA EVALUATION
 # =============================================================================
 
-def evaluate_phi_bbp(n_terms: int, precision: int = 100) -> float:
-    """Evaluate the φ-BBP formula."""
-    mp.dps = precision
-    
-    effective_coefs = [mpf(INT_COEFS[i]) + mpf(PHI_CORRECTIONS[i]) for i in range(8)]
-    
-    result = mpf(0)
-    for k in range(n_terms):
-        sign = mpf(-1)**k
-        base_term = mpf(1) / mpf(4096)**k
-        
-        inner = mpf(0)
-        for (period, offset), coef in zip(SLOTS, effective_coefs):
-            denom = period * k + offset
-            if denom != 0:
-                inner += coef / denom
-        
-        result += sign * base_term * inner
-    
-    return float(abs(result / mpf(64) - mp_pi))
+def _required_precision(n_terms: int) -> int:
+    """Working digits needed to resolve the error after n_terms terms.
 
+    The error shrinks by log10(4096) ≈ 3.61 digits per term; 20 guard digits
+    are added on top, with a floor of 30.
+    """
+    return max(30, int(3.61 * n_terms) + 20)
 
-def evaluate_integer_only(n_terms: int, precision: int = 100) -> float:
-    """Evaluate with integer coefficients only."""
-    mp.dps = precision
-    
-    result = mpf(0)
-    for k in range(n_terms):
-        sign = mpf(-1)**k
-        base_term = mpf(1) / mpf(4096)**k
-        
-        inner = mpf(0)
-        for (period, offset), coef in zip(SLOTS, INT_COEFS):
-            denom = period * k + offset
-            if denom != 0:
-                inner += mpf(coef) / denom
-        
-        result += sign * base_term * inner
-    
-    return float(abs(result / mpf(64) - mp_pi))
+
+# Highest working precision this script uses (Figure 1 at 50 terms)
+_PI_PRECISION = _required_precision(50)
+
+# Reference π, computed once at _PI_PRECISION; arithmetic with it rounds to
+# the current working precision
+with mp.workdps(_PI_PRECISION):
+    PI_HIGH = +mp_pi
 
 
 # =============================================================================
 # FIGURE 1: CONVERGENCE COMPARISON
 # =============================================================================
 
+def _phi_and_int_sequences(max_n: int, precision: int) -> Tuple[List[mpf], List[mpf]]:
+    """Return the φ-BBP and integer-only partial sums for 1..max_n terms.
+
+    Both sums share one k-loop. Element n-1 of each list is the formula
+    truncated to n terms. Results are cached on (max_n, precision).
+    """
+    key = (max_n, precision)
+    if key in _SEQUENCE_CACHE:
+        return _SEQUENCE_CACHE[key]
+    
+    with mp.workdps(precision):
+        effective_coefs = _effective_coefs()
+        
+        phi_sums = []
+        int_sums = []
+        phi_result = mpf(0)
+        int_result = mpf(0)
+        term = _INV_64
+        for k in range(max_n):
+            phi_result += term * _inner(effective_coefs, k)
+            int_result += term * _int_inner(k)
+            term *= _NEG_INV_4096
+            phi_sums.append(phi_result)
+            int_sums.append(int_result)
+        
+        _SEQUENCE_CACHE[key] = (phi_sums, int_sums)
+        return phi_sums, int_sums
+
+
 def figure1_convergence():
     """Generate convergence comparison figure."""
     print("Generating Figure 1: Convergence Comparison...")
     
     terms = list(range(1, 51))
     
-    # Compute errors
-    phi_bbp_errors = []
-    int_only_errors = []
-    
-    for n in terms:
-        phi_bbp_errors.append(evaluate_phi_bbp(n, precision=200))
-        int_only_errors.append(evaluate_integer_only(n, precision=200))
+    precision = _required_precision(terms[-1])
+    assert precision <= _PI_PRECISION, "precision exceeds the PI_HIGH reference"
+    
+    # Errors are cached on disk, keyed on everything they depend on, so
+    # re-runs skip the computation unless the formula changes
+    cache_key = hashlib.sha1(
+        repr((INT_COEFS, PHI_CORRECTIONS, SLOTS, terms, precision)).encode()
+    ).hexdigest()[:12]
+    cache_path = f'figures/.cache_convergence_{cache_key}.npz'
+    
+    try:
+        with np.load(cache_path) as cached:
+            phi_bbp_errors = cached['phi_bbp_errors']
+            int_only_errors = cached['int_only_errors']
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        # A missing or unreadable cache (e.g. from an interrupted run) is a miss
+        phi_bbp_errors = int_only_errors = None
+    
+    if phi_bbp_errors is None:
+        # Compute errors; both partial-sum sequences come from a single pass
+        phi_bbp_sums, int_only_sums = _phi_and_int_sequences(terms[-1], precision)
+        with mp.workdps(precision):
+            phi_bbp_errors = [float(abs(phi_bbp_sums[n - 1] - PI_HIGH)) for n in terms]
+            int_only_errors = [float(abs(int_only_sums[n - 1] - PI_HIGH)) for n in terms]
+        
+        # Write to a temporary file and move it into place, so an interrupted
+        # run never leaves a truncated cache behind
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, phi_bbp_errors=phi_bbp_errors, int_only_errors=int_only_errors)
+        os.replace(tmp_path, cache_path)
     
     # Theoretical convergence lines
     bellard_rate = np.log10(1024)  # 3.01
@@ -162,9 +251,6 @@ def figure2_corrections():
     """Generate φ-correction pattern figure."""
     print("Generating Figure 2: φ-Correction Pattern...")
     
-    mp.dps = 50
-    PHI = float(mp_phi)
-    
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
     
     # Left: Corrections as bar chart
@@ -184,7 +270,7 @@ def figure2_corrections():
     approx_errors = []
     labels = []
     for i, (corr, (num, den, phi_pow)) in enumerate(zip(PHI_CORRECTIONS, RATIONAL_APPROX)):
-        approx = (num / den) * (PHI ** phi_pow)
+        approx = (num / den) * _PHI_POW_CACHE[phi_pow]
         error = abs(corr - approx)
         approx_errors.append(error)
         labels.append(f"({num}/{den})×φ^{phi_pow}")
@@ -217,23 +303,19 @@ def figure3_closed_form():
     """Generate closed-form analysis figure."""
     print("Generating Figure 3: Closed-Form Analysis...")
     
-    mp.dps = 50
-    PHI = mpf(mp_phi)
-    
     total = sum(PHI_CORRECTIONS)
-    atan_phi = float(atan(1/PHI))
-    log_phi = float(log(PHI))
+    atan_phi = math.atan(1/PHI)
+    log_phi = math.log(PHI)
+    
+    # Closed-form coefficients (13/20, -26/25); the grid below only feeds the
+    # heatmap and is not searched
+    best_a = 13/20
+    best_b = -26/25
     
-    # Search grid for best (a/b, c/d) coefficients
-    best_errors = []
     a_range = np.linspace(-1, 1, 100)
     b_range = np.linspace(-2, 0, 100)
     
-    error_grid = np.zeros((len(a_range), len(b_range)))
-    for i, a in enumerate(a_range):
-        for j, b in enumerate(b_range):
-            predicted = a * atan_phi + b * log_phi
-            error_grid[i, j] = abs(predicted - total)
+    error_grid = np.abs(a_range[:, None] * atan_phi + b_range[None, :] * log_phi - total)
     
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
     
@@ -246,16 +328,14 @@ def figure3_closed_form():
     plt.colorbar(im, ax=ax1, label='log₁₀(error)')
     
     # Mark the best point
-    best_a = 13/20
-    best_b = -26/25
     ax1.plot(best_b, best_a, 'r*', markersize=15, label=f'Best: ({13}/{20}, {-26}/{25})')
     ax1.legend()
     
     # Right: Components breakdown
     components = {
-        'arctan(1/φ) term': (13/20) * atan_phi,
-        'log(φ) term': (-26/25) * log_phi,
-        'Sum (closed form)': (13/20) * atan_phi + (-26/25) * log_phi,
+        'arctan(1/φ) term': best_a * atan_phi,
+        'log(φ) term': best_b * log_phi,
+        'Sum (closed form)': best_a * atan_phi + best_b * log_phi,
         'Actual total': total,
     }
     
@@ -270,9 +350,7 @@ def figure3_closed_form():
     ax2.grid(True, alpha=0.3, axis='x')
     
     # Add value labels
-    for bar, val in zip(bars, values):
-        ax2.text(val + 0.005 if val > 0 else val - 0.005, bar.get_y() + bar.get_height()/2,
-                f'{val:.6f}', va='center', ha='left' if val > 0 else 'right', fontsize=10)
+    ax2.bar_label(bars, labels=[f'{v:.6f}' for v in values], padding=3, fontsize=10)
     
     plt.tight_layout()
     plt.savefig('figures/fig3_closed_form.png')
@@ -288,9 +366,6 @@ def figure4_structure():
     """Generate mathematical structure figure."""
     print("Generating Figure 4: Mathematical Structure...")
     
-    mp.dps = 50
-    PHI = float(mp_phi)
-    
     fig, axes = plt.subplots(2, 2, figsize=(12, 10))
     
     # Top-left: Powers of φ
@@ -353,9 +428,7 @@ def figure4_structure():
     ax.grid(True, alpha=0.3, axis='y')
     
     # Add value labels
-    for bar, rate in zip(bars, rates):
-        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
-               f'{rate:.2f}', ha='center', va='bottom', fontsize=10)
+    ax.bar_label(bars, labels=[f'{r:.2f}' for r in rates], padding=3, fontsize=10)
     
     plt.tight_layout()
     plt.savefig('figures/fig4_structure.png')
@@ -386,15 +459,12 @@ def generate_tables():
     print("  Saved: figures/table1_coefficients.md")
     
     # Table 2: Rational approximations
-    mp.dps = 50
-    PHI = float(mp_phi)
-    
     table2 = """
 | Slot | Correction | Approximation | Value | Error |
 |------|------------|---------------|-------|-------|
 """
     for i, (c, (n, d, k)) in enumerate(zip(PHI_CORRECTIONS, RATIONAL_APPROX)):
-        approx = (n/d) * (PHI ** k)
+        approx = (n/d) * _PHI_POW_CACHE[k]
         err = abs(c - approx)
         table2 += f"| {i} | {c:+.10f} | ({n:+d}/{d})×φ^{k} | {approx:+.10f} | {err:.2e} |\n"
     
@@ -13,8 +13,11 @@ This script verifies all claims made in the paper:
 Run: python verify_formula.py
 """
 
+import math
 import numpy as np
+from functools import lru_cache
 from mpmath import mp, mpf, pi as mp_pi, phi as mp_phi, log, atan, polylog
+from mpmath.libmp import BACKEND as MPMATH_BACKEND
 from typing import Dict, List, Tuple
 import time
 
@@ -54,51 +57,104 @@ RATIONAL_APPROX = [
 ]
 
 
+# Highest working precision of any check (the cap in verify_accuracy)
+_MAX_PRECISION = 300
+
+# Reference π, computed once at _MAX_PRECISION; arithmetic with it rounds to
+# the current working precision
+with mp.workdps(_MAX_PRECISION):
+    PI_HIGH = +mp_pi
+
+# Slot periods and offsets as separate lists of native ints, so denominators
+# stay Python ints and mpf / int division takes mpmath's integer fast path
+_PERIODS = [p for p, _ in SLOTS]
+_OFFSETS = [o for _, o in SLOTS]
+
+
+def _make_inner():
+    """Generate the unrolled slot sum c[0]/(4*k+1) + ... + c[7]/(12*k+11).
+
+    Every offset is positive, so no denominator is zero for k >= 0.
+    """
+    body = ' + '.join(f'c[{i}]/({p}*k+{o})' for i, (p, o) in enumerate(SLOTS))
+    namespace = {}
+    exec(f'def _inner(c, k):\n    return {body}\n', namespace)
+    return namespace['_inner']
+
+
+_inner = _make_inner()
+
+
+def _int_inner(k: int) -> mpf:
+    """Integer-only slot sum for term k, summed exactly and rounded once."""
+    denoms = [period * k + offset for period, offset in zip(_PERIODS, _OFFSETS)]
+    common = math.lcm(*denoms)
+    numer = sum(coef * (common // denom) for coef, denom in zip(INT_COEFS, denoms))
+    return mpf(numer) / common
+
+
+# mpf forms of the k-independent constants. -1/4096 and 1/64 are exact in
+# binary, so these are valid at any precision.
+_NEG_INV_4096 = mpf(-1) / mpf(4096)
+_INV_64 = mpf(1) / mpf(64)
+
+# INT_COEFS[i] + PHI_CORRECTIONS[i] rounds to the working precision, so the
+# effective coefficients are cached per mp.dps.
+_EFFECTIVE_COEFS_CACHE: Dict[int, List[mpf]] = {}
+
+
+def _effective_coefs() -> List[mpf]:
+    """Return the effective coefficients at the current mp.dps."""
+    coefs = _EFFECTIVE_COEFS_CACHE.get(mp.dps)
+    if coefs is None:
+        coefs = [mpf(INT_COEFS[i]) + mpf(PHI_CORRECTIONS[i]) for i in range(8)]
+        _EFFECTIVE_COEFS_CACHE[mp.dps] = coefs
+    return coefs
+
+
 # =============================================================================
 # FORMULA EVALUATION
 # =============================================================================
 
+def _required_precision(n_terms: int) -> int:
+    """Working digits needed to resolve the error after n_terms terms.
+
+    The error shrinks by log10(4096) ≈ 3.61 digits per term; 20 guard digits
+    are added on top, with a floor of 30.
+    """
+    return max(30, int(3.61 * n_terms) + 20)
+
+
+@lru_cache(maxsize=None)
 def evaluate_phi_bbp(n_terms: int, precision: int = 200) -> mpf:
     """Evaluate the φ-BBP formula."""
-    mp.dps = precision
-    PHI = mpf(mp_phi)
-    
-    effective_coefs = [mpf(INT_COEFS[i]) + mpf(PHI_CORRECTIONS[i]) for i in range(8)]
-    
-    result = mpf(0)
-    for k in range(n_terms):
-        sign = mpf(-1)**k
-        base_term = mpf(1) / mpf(4096)**k
+    # Callers compare the result against PI_HIGH at this precision
+    assert precision <= _MAX_PRECISION, "precision exceeds the PI_HIGH reference"
+    with mp.workdps(precision):
+        effective_coefs = _effective_coefs()
         
-        inner = mpf(0)
-        for (period, offset), coef in zip(SLOTS, effective_coefs):
-            denom = period * k + offset
-            if denom != 0:
-                inner += coef / denom
+        result = mpf(0)
+        term = _INV_64
+        for k in range(n_terms):
+            result += term * _inner(effective_coefs, k)
+            term *= _NEG_INV_4096
         
-        result += sign * base_term * inner
-    
-    return result / mpf(64)
+        return result
 
 
+@lru_cache(maxsize=None)
 def evaluate_integer_only(n_terms: int, precision: int = 200) -> mpf:
     """Evaluate with integer coefficients only."""
-    mp.dps = precision
-    
-    result = mpf(0)
-    for k in range(n_terms):
-        sign = mpf(-1)**k
-        base_term = mpf(1) / mpf(4096)**k
-        
-        inner = mpf(0)
-        for (period, offset), coef in zip(SLOTS, INT_COEFS):
-            denom = period * k + offset
-            if denom != 0:
-                inner += mpf(coef) / denom
+    # Callers compare the result against PI_HIGH at this precision
+    assert precision <= _MAX_PRECISION, "precision exceeds the PI_HIGH reference"
+    with mp.workdps(precision):
+        result = mpf(0)
+        term = _INV_64
+        for k in range(n_terms):
+            result += term * _int_inner(k)
+            term *= _NEG_INV_4096
         
-        result += sign * base_term * inner
-    
-    return result / mpf(64)
+        return result
 
 
 # =============================================================================
@@ -111,17 +167,20 @@ def verify_accuracy():
     print("1. FORMULA ACCURACY")
     print("=" * 70)
     
-    mp.dps = 300
-    
+    # Precision grows with the term count, capped at _MAX_PRECISION digits
     for n_terms in [10, 50, 100, 200]:
-        value = evaluate_phi_bbp(n_terms, precision=300)
-        error = abs(value - mp_pi)
+        precision = min(_MAX_PRECISION, _required_precision(n_terms))
+        value = evaluate_phi_bbp(n_terms, precision=precision)
+        with mp.workdps(precision):
+            error = abs(value - PI_HIGH)
         
         print(f"  {n_terms:3d} terms: error = {float(error):.2e}")
     
     # Final verification
-    value = evaluate_phi_bbp(100, precision=300)
-    error = float(abs(value - mp_pi))
+    precision = min(_MAX_PRECISION, _required_precision(100))
+    value = evaluate_phi_bbp(100, precision=precision)
+    with mp.workdps(precision):
+        error = float(abs(value - PI_HIGH))
     
     print(f"\n  CLAIM: error < 10⁻²¹")
     print(f"  ACTUAL: error = {error:.2e}")
@@ -136,14 +195,14 @@ def verify_convergence_rate():
     print("2. CONVERGENCE RATE")
     print("=" * 70)
     
-    # Use very high precision to measure convergence before hitting machine precision
-    mp.dps = 2000
-    
-    # Compute errors at different term counts
+    # Use enough precision per term count to measure convergence before
+    # hitting machine precision
     errors = []
     for n in [1, 2, 3, 4, 5]:
-        value = evaluate_phi_bbp(n, precision=2000)
-        error = float(abs(value - mp_pi))
+        precision = _required_precision(n)
+        value = evaluate_phi_bbp(n, precision=precision)
+        with mp.workdps(precision):
+            error = float(abs(value - PI_HIGH))
         errors.append((n, error))
         print(f"  {n:2d} terms: error = {error:.2e}")
     
@@ -175,14 +234,15 @@ def verify_phi_pattern():
     print("3. φ-CORRECTION PATTERN")
     print("=" * 70)
     
-    mp.dps = 50
-    PHI = mpf(mp_phi)
+    with mp.workdps(50):
+        PHI = mpf(mp_phi)
+        phi_pow_cache = {k: PHI**k for k in set(p for _, _, p in RATIONAL_APPROX)}
+        approxs = [float((num / den) * phi_pow_cache[phi_pow]) for num, den, phi_pow in RATIONAL_APPROX]
     
     print("\n  Correction = (n/d) × φ^k approximations:\n")
     
     all_verified = True
-    for i, (corr, (num, den, phi_pow)) in enumerate(zip(PHI_CORRECTIONS, RATIONAL_APPROX)):
-        approx = float((num / den) * (PHI ** phi_pow))
+    for i, (corr, approx, (num, den, phi_pow)) in enumerate(zip(PHI_CORRECTIONS, approxs, RATIONAL_APPROX)):
         error = abs(corr - approx)
         
         verified = error < 1e-4
@@ -202,13 +262,12 @@ def verify_total_correction():
     print("4. TOTAL CORRECTION CLOSED FORM")
     print("=" * 70)
     
-    mp.dps = 50
-    PHI = mpf(mp_phi)
-    
     total = sum(PHI_CORRECTIONS)
     
-    atan_phi = float(atan(1/PHI))
-    log_phi = float(log(PHI))
+    with mp.workdps(50):
+        PHI = mpf(mp_phi)
+        atan_phi = float(atan(1/PHI))
+        log_phi = float(log(PHI))
     
     # Closed form: (13/20)×arctan(1/φ) + (-26/25)×log(φ)
     closed_form = (13/20) * atan_phi + (-26/25) * log_phi
@@ -253,13 +312,21 @@ def verify_mathematical_identities():
     print("6. MATHEMATICAL IDENTITIES")
     print("=" * 70)
     
-    mp.dps = 50
-    PHI = mpf(mp_phi)
+    with mp.workdps(50):
+        PHI = mpf(mp_phi)
+        val1 = PHI**2 + PHI**(-2)
+        val2 = PHI**2 + PHI**(-2) + 1
+        val3 = atan(1/PHI) + atan(1/PHI**3)
+        expected3 = PI_HIGH/4
+        # Li₁(z) = -log(1 - z) in closed form
+        val4 = -log(1 - 1/PHI)
+        expected4 = 2 * log(PHI)
+        val5 = polylog(2, 1/PHI**2)
+        expected5 = PI_HIGH**2/15 - log(PHI)**2
     
     all_verified = True
     
     # Identity 1: φ² + φ⁻² = 3
-    val1 = PHI**2 + PHI**(-2)
     err1 = abs(float(val1) - 3)
     print(f"\n  φ² + φ⁻² = {float(val1):.15f}")
     print(f"  Expected: 3")
@@ -267,7 +334,6 @@ def verify_mathematical_identities():
     all_verified = all_verified and (err1 < 1e-10)
     
     # Identity 2: 4 = φ² + φ⁻² + 1
-    val2 = PHI**2 + PHI**(-2) + 1
     err2 = abs(float(val2) - 4)
     print(f"\n  φ² + φ⁻² + 1 = {float(val2):.15f}")
     print(f"  Expected: 4")
@@ -275,16 +341,13 @@ def verify_mathematical_identities():
     all_verified = all_verified and (err2 < 1e-10)
     
     # Identity 3: arctan(1/φ) + arctan(1/φ³) = π/4
-    val3 = atan(1/PHI) + atan(1/PHI**3)
-    err3 = abs(float(val3) - float(mp_pi/4))
+    err3 = abs(float(val3) - float(expected3))
     print(f"\n  arctan(1/φ) + arctan(1/φ³) = {float(val3):.15f}")
-    print(f"  π/4 = {float(mp_pi/4):.15f}")
+    print(f"  π/4 = {float(expected3):.15f}")
     print(f"  Error: {err3:.2e} {'✓' if err3 < 1e-10 else '✗'}")
     all_verified = all_verified and (err3 < 1e-10)
     
     # Identity 4: Li₁(1/φ) = 2×log(φ)
-    val4 = polylog(1, 1/PHI)
-    expected4 = 2 * log(PHI)
     err4 = abs(float(val4) - float(expected4))
     print(f"\n  Li₁(1/φ) = {float(val4):.15f}")
     print(f"  2×log(φ) = {float(expected4):.15f}")
@@ -292,8 +355,6 @@ def verify_mathematical_identities():
     all_verified = all_verified and (err4 < 1e-10)
     
     # Identity 5: Li₂(1/φ²) = π²/15 - log²(φ)
-    val5 = polylog(2, 1/PHI**2)
-    expected5 = mp_pi**2/15 - log(PHI)**2
     err5 = abs(float(val5) - float(expected5))
     print(f"\n  Li₂(1/φ²) = {float(val5):.15f}")
     print(f"  π²/15 - log²(φ) = {float(expected5):.15f}")
@@ -311,13 +372,12 @@ def verify_integer_improvement():
     print("7. IMPROVEMENT OVER INTEGER-ONLY")
     print("=" * 70)
     
-    mp.dps = 100
-    
     int_value = evaluate_integer_only(100, precision=100)
     phi_value = evaluate_phi_bbp(100, precision=100)
     
-    int_error = float(abs(int_value - mp_pi))
-    phi_error = float(abs(phi_value - mp_pi))
+    with mp.workdps(100):
+        int_error = float(abs(int_value - PI_HIGH))
+        phi_error = float(abs(phi_value - PI_HIGH))
     
     improvement = int_error / phi_error
     
@@ -339,6 +399,8 @@ def main():
     print("=" * 70)
     print("φ-BBP FORMULA VERIFICATION")
     print("=" * 70)
+    note = "" if MPMATH_BACKEND == "gmpy" else " (install gmpy2 for faster arithmetic)"
+    print(f"\nmpmath backend: {MPMATH_BACKEND}{note}")
     print("\nVerifying all claims from the paper...\n")
     
     results = []